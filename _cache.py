@@ -0,0 +1,49 @@
+"""
+Parquet input for the analysis scripts
+
+Two sources can exist: ideas.parquet, written by main_ideas.py, and the
+committed ideas.csv. Whichever was modified more recently is used, and the
+choice is printed. When the CSV wins it is converted to ideas.cache.parquet
+whenever that copy is missing or older than the CSV, so analysis scripts read
+typed, columnar data instead of re-parsing the CSV on every run. The cache
+never overwrites main_ideas.py's output.
+"""
+
+import os
+
+import polars as pl
+
+CSV_PATH = 'ideas.csv'
+FETCHED_PATH = 'ideas.parquet'
+PARQUET_PATH = 'ideas.cache.parquet'
+
+# pandas' default NA markers, so completion counts match the old read_csv load
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+             '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+             'n/a', 'nan', 'null']
+
+# status and type are low-cardinality labels; store them dictionary-encoded
+SCHEMA_OVERRIDES = {
+    'createdDate': pl.Int64,
+    'status': pl.Categorical,
+    'type': pl.Categorical,
+}
+
+def ideas_parquet(csv_path=CSV_PATH, parquet_path=PARQUET_PATH, fetched_path=FETCHED_PATH):
+    """
+    Return the Parquet file to analyse: fetched_path if it is newer than csv_path
+    (or csv_path is missing), else an up-to-date Parquet copy of csv_path.
+    """
+    if os.path.exists(fetched_path):
+        if not os.path.exists(csv_path) or os.path.getmtime(fetched_path) >= os.path.getmtime(csv_path):
+            print(f"Using {fetched_path} (main_ideas.py output)")
+            return fetched_path
+        print(f"Using {csv_path}: it is newer than {fetched_path}")
+    if (not os.path.exists(parquet_path)
+            or os.path.getmtime(parquet_path) < os.path.getmtime(csv_path)):
+        print(f"Caching {csv_path} -> {parquet_path}")
+        # Streamed in batches, so memory stays flat however large the CSV grows
+        pl.scan_csv(csv_path, encoding='utf8', null_values=NA_VALUES,
+                    schema_overrides=SCHEMA_OVERRIDES
+                    ).sink_parquet(parquet_path, compression='zstd')
+    return parquet_path
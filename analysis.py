@@ -5,163 +5,217 @@ Analyzes startup data from ideas.csv and generates all charts and insights
 """
 
 import pandas as pd
+import polars as pl
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def main():
-    # Load data
-    print("Loading startup data...")
-    df = pd.read_csv('ideas.csv', encoding='utf-8')
+from _cache import NA_VALUES, ideas_parquet
 
-    # Convert dates
-    df['createdDate'] = pd.to_datetime(df['createdDate'], unit='ms', errors='coerce')
-    df['year'] = df['createdDate'].dt.year
-    df['month'] = df['createdDate'].dt.month
-    df['quarter'] = df['createdDate'].dt.quarter
+READINESS_COLUMNS = ['meta.businessmodeldescription', 'meta.problemdescription',
+                     'meta.valuepropdescription']
 
-    # Create assets directory
-    os.makedirs('assets', exist_ok=True)
+# The only columns analysis.py reads from the Parquet cache
+COLUMNS = ['status', 'createdDate', *READINESS_COLUMNS]
 
-    # Set style
-    plt.style.use('seaborn-v0_8')
+# Text columns whose placeholder values ('', 'n/a', ...) count as missing
+TEXT_COLUMNS = ['status', *READINESS_COLUMNS]
 
-    print("Creating visualizations...")
+# One figure per process, reused by every chart that process renders
+_FIG = None
+
+def reset_axes(figsize):
+    """Clear this process's shared figure, resize it and return a fresh axes."""
+    global _FIG
+    if _FIG is None:
+        plt.style.use('seaborn-v0_8')
+        _FIG = plt.figure(figsize=figsize)
+    _FIG.clear()
+    _FIG.set_size_inches(*figsize)
+    return _FIG.add_subplot(111)
 
-    # 1. Status Distribution (Bar Chart)
-    plt.figure(figsize=(12, 8))
-    status_counts = df['status'].value_counts().sort_values(ascending=True)
+def render_status(status_counts, path):
+    ax = reset_axes((12, 8))
     colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FECA57', '#FF9FF3', '#54A0FF', '#5F27CD']
 
-    bars = plt.barh(range(len(status_counts)), status_counts.values,
+    bars = ax.barh(range(len(status_counts)), status_counts.values,
                    color=colors[:len(status_counts)], alpha=0.8)
 
-    plt.yticks(range(len(status_counts)), status_counts.index, fontsize=12)
-    plt.xlabel('Number of Startups', fontsize=12)
-    plt.title('Startup Status Distribution', fontsize=16, fontweight='bold', pad=20)
+    ax.set_yticks(range(len(status_counts)), status_counts.index, fontsize=12)
+    ax.set_xlabel('Number of Startups', fontsize=12)
+    ax.set_title('Startup Status Distribution', fontsize=16, fontweight='bold', pad=20)
 
     total = sum(status_counts.values)
-    for i, bar in enumerate(bars):
-        width = bar.get_width()
-        percentage = (width / total) * 100
-        plt.text(width + 5, bar.get_y() + bar.get_height()/2,
-                f'{int(width)} ({percentage:.1f}%)',
-                ha='left', va='center', fontweight='bold', fontsize=11)
-
-    plt.grid(axis='x', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('assets/status_distribution_bars.png', dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # 2. Yearly Submissions
-    plt.figure(figsize=(12, 6))
-    yearly_counts = df['year'].value_counts().sort_index()
-    bars = plt.bar(yearly_counts.index, yearly_counts.values, color='steelblue', alpha=0.8)
-    plt.title('Startup Submissions by Year', fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Year', fontsize=12)
-    plt.ylabel('Number of Submissions', fontsize=12)
-
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 2,
-                f'{int(height)}', ha='center', va='bottom', fontweight='bold')
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('assets/yearly_submissions.png', dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # 3. Monthly Heatmap
-    plt.figure(figsize=(12, 8))
-    monthly_pivot = df.groupby(['year', 'month']).size().unstack(fill_value=0)
-    sns.heatmap(monthly_pivot, annot=True, fmt='d', cmap='YlOrRd',
-               cbar_kws={'label': 'Number of Submissions'})
-    plt.title('Startup Submissions Heatmap (Year vs Month)', fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Month', fontsize=12)
-    plt.ylabel('Year', fontsize=12)
-    plt.tight_layout()
-    plt.savefig('assets/monthly_heatmap.png', dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # 4. Quarterly Trends
-    plt.figure(figsize=(12, 6))
-    quarterly_data = df.groupby(['year', 'quarter']).size().reset_index(name='count')
-    quarterly_data['period'] = quarterly_data['year'].astype(str) + '-Q' + quarterly_data['quarter'].astype(str)
-
-    plt.plot(quarterly_data['period'], quarterly_data['count'], marker='o',
+    labels = [f'{int(v)} ({v / total * 100:.1f}%)' for v in status_counts.values]
+    ax.bar_label(bars, labels=labels, padding=5, fontweight='bold', fontsize=11)
+
+    ax.grid(axis='x', alpha=0.3)
+    _FIG.tight_layout()
+    _FIG.savefig(path, dpi=300)
+
+def render_yearly(yearly_counts, path):
+    ax = reset_axes((12, 6))
+    bars = ax.bar(yearly_counts.index, yearly_counts.values, color='steelblue', alpha=0.8)
+    ax.set_title('Startup Submissions by Year', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Year', fontsize=12)
+    ax.set_ylabel('Number of Submissions', fontsize=12)
+
+    labels = [f'{int(v)}' for v in yearly_counts.values]
+    ax.bar_label(bars, labels=labels, padding=3, fontweight='bold')
+
+    ax.grid(axis='y', alpha=0.3)
+    _FIG.tight_layout()
+    _FIG.savefig(path, dpi=300)
+
+def render_heatmap(monthly_pivot, path):
+    ax = reset_axes((12, 8))
+    annot = monthly_pivot.astype(str).to_numpy()
+    sns.heatmap(monthly_pivot, annot=annot, fmt='', cmap='YlOrRd',
+               cbar_kws={'label': 'Number of Submissions'}, ax=ax)
+    ax.set_title('Startup Submissions Heatmap (Year vs Month)', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Year', fontsize=12)
+    _FIG.tight_layout()
+    _FIG.savefig(path, dpi=300)
+
+def render_quarterly(quarterly_data, path):
+    ax = reset_axes((12, 6))
+    ax.plot(quarterly_data['period'], quarterly_data['count'], marker='o',
             linewidth=3, markersize=8, color='darkgreen')
-    plt.title('Quarterly Submission Trends', fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Quarter', fontsize=12)
-    plt.ylabel('Number of Submissions', fontsize=12)
-    plt.xticks(rotation=45)
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('assets/quarterly_trends.png', dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # 5. Business Readiness
-    plt.figure(figsize=(10, 6))
-    total = len(df)
-    completion_metrics = {
-        'Business Model': len(df['meta.businessmodeldescription'].dropna()),
-        'Problem Description': len(df['meta.problemdescription'].dropna()),
-        'Value Proposition': len(df['meta.valuepropdescription'].dropna())
-    }
-
+    ax.set_title('Quarterly Submission Trends', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Quarter', fontsize=12)
+    ax.set_ylabel('Number of Submissions', fontsize=12)
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3)
+    _FIG.tight_layout()
+    _FIG.savefig(path, dpi=300)
+
+def render_readiness(completion_metrics, total, path):
+    ax = reset_axes((10, 6))
     categories = list(completion_metrics.keys())
     values = list(completion_metrics.values())
     percentages = [(v/total)*100 for v in values]
 
-    bars = plt.bar(categories, percentages, color=['#FF6B6B', '#4ECDC4', '#45B7D1'], alpha=0.8)
-    plt.title('Business Readiness: Completion Rates', fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Component', fontsize=12)
-    plt.ylabel('Completion Rate (%)', fontsize=12)
-
-    for i, bar in enumerate(bars):
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 1,
-                f'{height:.1f}%\n({values[i]})', ha='center', va='bottom', fontweight='bold')
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('assets/business_readiness.png', dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # 6. Summary Stats
-    plt.figure(figsize=(12, 6))
-    status_counts = df['status'].value_counts()
-    summary_data = {
-        'Total Startups': len(df),
-        'Approved': status_counts.get('APPROVED', 0),
-        'Alumni': status_counts.get('ALUMNI', 0),
-        'Rejected': status_counts.get('REJECTED', 0)
-    }
+    bars = ax.bar(categories, percentages, color=['#FF6B6B', '#4ECDC4', '#45B7D1'], alpha=0.8)
+    ax.set_title('Business Readiness: Completion Rates', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Component', fontsize=12)
+    ax.set_ylabel('Completion Rate (%)', fontsize=12)
 
+    labels = [f'{p:.1f}%\n({v})' for p, v in zip(percentages, values)]
+    ax.bar_label(bars, labels=labels, padding=3, fontweight='bold')
+
+    ax.grid(axis='y', alpha=0.3)
+    _FIG.tight_layout()
+    _FIG.savefig(path, dpi=300)
+
+def render_summary(summary_data, path):
+    ax = reset_axes((12, 6))
     categories = list(summary_data.keys())
     values = list(summary_data.values())
 
-    bars = plt.bar(categories, values, color=['#2E86C1', '#28B463', '#F39C12', '#E74C3C'], alpha=0.8)
-    plt.title('Startup Ecosystem Summary Statistics', fontsize=16, fontweight='bold', pad=20)
-    plt.ylabel('Count', fontsize=12)
+    bars = ax.bar(categories, values, color=['#2E86C1', '#28B463', '#F39C12', '#E74C3C'], alpha=0.8)
+    ax.set_title('Startup Ecosystem Summary Statistics', fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylabel('Count', fontsize=12)
+
+    labels = [f'{int(v)}' for v in values]
+    ax.bar_label(bars, labels=labels, padding=3, fontweight='bold', fontsize=12)
+
+    ax.grid(axis='y', alpha=0.3)
+    _FIG.tight_layout()
+    _FIG.savefig(path, dpi=300)
+
+def load_data():
+    """Lazily scan the analysed columns from ideas.parquet."""
+    text = pl.col(TEXT_COLUMNS)
+    # main_ideas.py writes raw API values; treat placeholders such as '' or
+    # 'n/a' as missing, the same way the CSV conversion does
+    return pl.scan_parquet(ideas_parquet()).select(COLUMNS).with_columns(
+        pl.when(text.is_in(NA_VALUES)).then(None).otherwise(text).name.keep()
+    )
+
+def aggregate(lf):
+    """Compute every chart's input from lf as small, picklable objects."""
+    # Derive date parts once from the epoch millis, stored as int16
+    created = pl.from_epoch('createdDate', time_unit='ms')
+    dated = lf.with_columns([
+        created.dt.year().cast(pl.Int16).alias('year'),
+        created.dt.month().cast(pl.Int16).alias('month'),
+    ])
+
+    # One group_by over (year, month, status); the per-chart counts are
+    # summed from this small frame instead of re-hashing every row.
+    # The streaming engine aggregates batch by batch, so peak memory is
+    # bounded by the batch size rather than the file size.
+    counts, readiness_df = pl.collect_all([
+        dated.group_by(['year', 'month', 'status']).agg(pl.len().alias('n')),
+        lf.select(pl.len().alias('total'), pl.col(READINESS_COLUMNS).count()),
+    ], engine='streaming')
+    by_date = counts.drop_nulls('year')
+    status_df = counts.drop_nulls('status').group_by('status').agg(pl.col('n').sum()).sort(['n', 'status'])
+    yearly_df = by_date.group_by('year').agg(pl.col('n').sum()).sort('year')
+    monthly_df = by_date.group_by(['year', 'month']).agg(pl.col('n').sum())
+    quarterly_df = (by_date.with_columns(((pl.col('month') - 1) // 3 + 1).alias('quarter'))
+                    .group_by(['year', 'quarter']).agg(pl.col('n').sum().alias('count'))
+                    .sort(['year', 'quarter']))
+    readiness = readiness_df.row(0, named=True)
+
+    status_counts = status_df.to_pandas().set_index('status')['n']
+    quarterly_data = quarterly_df.to_pandas()
+    quarters = pd.PeriodIndex.from_fields(year=quarterly_data['year'], quarter=quarterly_data['quarter'], freq='Q')
+    quarterly_data['period'] = quarters.strftime('%Y-Q%q')
+
+    return {
+        'total': readiness['total'],
+        'status_counts': status_counts,
+        'yearly_counts': yearly_df.to_pandas().set_index('year')['n'],
+        'monthly_pivot': monthly_df.to_pandas().set_index(['year', 'month'])['n'].unstack(fill_value=0),
+        'quarterly_data': quarterly_data,
+        'completion_metrics': {
+            'Business Model': readiness['meta.businessmodeldescription'],
+            'Problem Description': readiness['meta.problemdescription'],
+            'Value Proposition': readiness['meta.valuepropdescription']
+        },
+        'summary_data': {
+            'Total Startups': readiness['total'],
+            'Approved': status_counts.get('APPROVED', 0),
+            'Alumni': status_counts.get('ALUMNI', 0),
+            'Rejected': status_counts.get('REJECTED', 0)
+        },
+    }
 
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 5,
-                f'{int(height)}', ha='center', va='bottom', fontweight='bold', fontsize=12)
+def render_all(aggs, outdir):
+    """Render every chart from aggregate()'s output into outdir; return the paths."""
+    os.makedirs(outdir, exist_ok=True)
+    tasks = [
+        (render_status, aggs['status_counts'], 'status_distribution_bars.png'),
+        (render_yearly, aggs['yearly_counts'], 'yearly_submissions.png'),
+        (render_heatmap, aggs['monthly_pivot'], 'monthly_heatmap.png'),
+        (render_quarterly, aggs['quarterly_data'], 'quarterly_trends.png'),
+        (render_readiness, aggs['completion_metrics'], aggs['total'], 'business_readiness.png'),
+        (render_summary, aggs['summary_data'], 'summary_statistics.png'),
+    ]
+    paths = [os.path.join(outdir, task[-1]) for task in tasks]
+    # Charts are independent and CPU-bound in PNG rasterization; render in parallel
+    with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as ex:
+        futures = [ex.submit(func, *args, path) for (func, *args, _), path in zip(tasks, paths)]
+        for future in futures:
+            future.result()
+    return paths
+
+def main(outdir='assets'):
+    print("Loading startup data...")
+    aggs = aggregate(load_data())
 
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('assets/summary_statistics.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    print("Creating visualizations...")
+    paths = render_all(aggs, outdir)
 
     print("\nAnalysis complete! Generated charts:")
-    print("- assets/status_distribution_bars.png")
-    print("- assets/yearly_submissions.png")
-    print("- assets/monthly_heatmap.png")
-    print("- assets/quarterly_trends.png")
-    print("- assets/business_readiness.png")
-    print("- assets/summary_statistics.png")
+    for path in paths:
+        print(f"- {path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
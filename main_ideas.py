@@ -2,31 +2,44 @@
 """
 main_ideas.py
 
-Minimal script to fetch "ideas" (ticket/kickbox data) from two endpoints and save to CSV and Excel.
+Minimal script to fetch "ideas" (ticket/kickbox data) from two endpoints and save to Parquet (and optionally CSV/Excel).
 
 Usage:
     1) Edit TOKEN in this file (hardcoded) to your Bearer token.
     2) Optionally adjust date range and limits in the CONFIG section below.
     3) Run:
-        python3 main_ideas.py
+        python3 main_ideas.py                # Parquet only
+        python3 main_ideas.py --csv --xlsx   # Parquet, CSV and Excel
+        python3 main_ideas.py --refresh      # ignore cached IDs/batches and re-download
+
+Canonical IDs are cached in ids.cache.json and each batch response under batches/,
+so a re-run (or a run resumed after a network error) only fetches what is missing.
 
 Produces:
- - ideas.csv
- - ideas.xlsx
+ - ideas.parquet
+ - ideas.csv (with --csv)
+ - ideas.xlsx (with --xlsx)
 
 Dependencies:
-    pip install requests pandas openpyxl
+    pip install "httpx[http2]" orjson pandas pyarrow openpyxl
 """
 
 from __future__ import annotations
-import copy
-import json
+import argparse
+import hashlib
 import sys
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from itertools import islice
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
+import httpx
+import openpyxl
+import orjson
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 # ----------------- CONFIG (edit as needed) -----------------
 # Put your token here (hardcoded for one-command run)
@@ -52,7 +65,19 @@ SAFE_TOTAL_CAP = 20000
 # How many canonical IDs to send per fetchByCanonicalIdByBatch call
 BATCH_SIZE = 100
 
+# How many batch requests to keep in flight at once
+FETCH_WORKERS = 16
+
+# Retries (with exponential backoff) for batch requests that fail on the network or with 429/5xx
+BATCH_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Caches reused across runs (see --refresh)
+IDS_CACHE = "ids.cache.json"
+BATCH_CACHE_DIR = "batches"
+
 # Output files
+PARQUET_OUTPUT = "ideas.parquet"
 CSV_OUTPUT = "ideas.csv"
 XLSX_OUTPUT = "ideas.xlsx"
 # ----------------------------------------------------------
@@ -65,53 +90,87 @@ def chunked_iterable(iterable, size):
             break
         yield chunk
 
-def flatten_dict(d: Dict[str, Any], parent: str = "") -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
-    for k, v in d.items():
-        key = f"{parent}.{k}" if parent else k
-        if isinstance(v, dict):
-            out.update(flatten_dict(v, key))
-        else:
-            out[key] = v
-    return out
+def format_list(v: Any) -> Any:
+    """
+    Render a list value as a single cell:
+     - simple lists -> comma-joined strings
+     - complex lists -> JSON-encoded into a single cell
+    Lists in API responses are homogeneous, so the first element decides which.
+    Non-list values are returned unchanged.
+    """
+    if not isinstance(v, list):
+        return v
+    if not v:
+        return ""
+    if type(v[0]) not in (dict, list):
+        return ", ".join(map(str, v))
+    try:
+        return orjson.dumps(v).decode()
+    except Exception:
+        return str(v)
 
 def normalize_ideas(ideas: List[Dict]) -> pd.DataFrame:
     """
     Flatten idea objects into a pandas DataFrame:
      - nested dicts -> dot notation
      - simple lists -> comma-joined strings
-     - complex lists -> json.dumps into a single cell
+     - complex lists -> JSON-encoded into a single cell
     """
-    rows = []
-    keys = set()
-    for idea in ideas:
-        flat: Dict[str, Any] = {}
-        for k, v in idea.items():
-            if isinstance(v, dict):
-                flat.update(flatten_dict(v, parent=k))
-            elif isinstance(v, list):
-                if all(not isinstance(x, (dict, list)) for x in v):
-                    flat[k] = ", ".join(str(x) for x in v)
-                else:
-                    try:
-                        flat[k] = json.dumps(v, ensure_ascii=False)
-                    except Exception:
-                        flat[k] = str(v)
-            else:
-                flat[k] = v
-        rows.append(flat)
-        keys.update(flat.keys())
+    df = pd.json_normalize(ideas, sep=".")
+
+    # Only columns that actually hold lists need a per-cell pass; any cell may
+    # be the first list (a field can be a scalar in one idea and a list in another)
+    for col in df.columns[df.dtypes == object]:
+        if df[col].map(type).eq(list).any():
+            df[col] = df[col].map(format_list)
+        # Arrow needs one type per column; a field that is 7 in one idea and "X7"
+        # in another is written as text, as the CSV would show it anyway
+        if df[col].dropna().map(type).nunique() > 1:
+            df[col] = df[col].map(str, na_action="ignore")
+
+    # json_normalize upcasts int columns with gaps to float; restore them as
+    # nullable ints so CSV cells keep their original formatting. Real float
+    # fields (2.0, 3.0) stay float, so only columns that were ints in the source.
+    for col in df.columns[df.dtypes == "float64"]:
+        if holds_only_ints(ideas, col.split(".")):
+            df[col] = df[col].astype("Int64")
 
     preferred = ["id", "canonicalId", "title", "status", "type", "createdDate", "creator"]
-    rest = sorted(k for k in keys if k not in preferred)
-    ordered = [k for k in preferred if k in keys] + rest
-
-    df = pd.DataFrame([{k: r.get(k, "") for k in ordered} for r in rows])
-    return df
-
-def try_post(session: requests.Session, url: str, payload: Dict, timeout: int = 30):
+    present = [k for k in preferred if k in df.columns]
+    rest = sorted(k for k in df.columns if k not in preferred)
+    return df[present + rest]
+
+def holds_only_ints(ideas: List[Dict], path: List[str]) -> bool:
+    """True if every non-null value at path (nested keys) in ideas is an int, and there is at least one."""
+    seen = False
+    for value in ideas:
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            continue
+        if type(value) is not int:
+            return False
+        seen = True
+    return seen
+
+def write_xlsx(df: pd.DataFrame, path: str) -> None:
+    """
+    Write df to an .xlsx file through a write-only openpyxl workbook.
+    Rows are streamed to disk as they are appended instead of building the full cell grid in memory.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(df.columns))
+    # NaN/NA -> None so missing values become empty cells, as with DataFrame.to_excel;
+    # converted per row so no second full-size copy of df is built
+    for row in df.itertuples(index=False, name=None):
+        ws.append([None if pd.isna(x) else x for x in row])
+    wb.save(path)
+
+def try_post(client: httpx.Client, url: str, payload: Dict, timeout: int = 30):
     try:
-        resp = session.post(url, json=payload, timeout=timeout)
+        # The client's default headers already carry Content-Type: application/json
+        resp = client.post(url, content=orjson.dumps(payload), timeout=timeout)
     except Exception as e:
         print(f"Network error when calling {url}: {e}")
         return None
@@ -123,50 +182,64 @@ def extract_canonical_ids_from_search_response(resp_json: Any) -> List[str]:
     The example you provided is an array like:
       [ {"ticketCanonicalId":"PASHAHolding-kickbox-1950", "index":"ticket"}, ... ]
     """
-    out: List[str] = []
     if isinstance(resp_json, list):
-        for el in resp_json:
-            if isinstance(el, dict):
-                val = el.get("ticketCanonicalId") or el.get("canonicalId") or el.get("id")
-                if isinstance(val, str) and val.strip():
-                    out.append(val)
+        vals = [el.get("ticketCanonicalId") or el.get("canonicalId") or el.get("id")
+                for el in resp_json if isinstance(el, dict)]
     elif isinstance(resp_json, dict):
         # sometimes the endpoint could return object with hits/hits structure; try common paths
         # e.g. {"hits": {"hits": [{...}, {...}]}}
         maybe_hits = resp_json.get("hits")
-        if isinstance(maybe_hits, dict):
-            inner = maybe_hits.get("hits")
-            if isinstance(inner, list):
-                for it in inner:
-                    if isinstance(it, dict):
-                        # try multiple paths
-                        val = it.get("_source", {}).get("ticketCanonicalId") or it.get("_source", {}).get("canonicalId")
-                        if not val:
-                            val = it.get("ticketCanonicalId") or it.get("canonicalId")
-                        if isinstance(val, str) and val.strip():
-                            out.append(val)
-    return out
+        inner = maybe_hits.get("hits") if isinstance(maybe_hits, dict) else None
+        if not isinstance(inner, list):
+            return []
+        vals = [hit_canonical_id(it) for it in inner if isinstance(it, dict)]
+    else:
+        return []
+    return [val for val in vals if isinstance(val, str) and val.strip()]
+
+def hit_canonical_id(hit: Dict) -> Any:
+    # try multiple paths; _source is looked up once per hit
+    source = hit.get("_source") or {}
+    return (source.get("ticketCanonicalId") or source.get("canonicalId")
+            or hit.get("ticketCanonicalId") or hit.get("canonicalId"))
+
+# Response key holding an opaque next-page cursor -> payload key to send it back under
+CURSOR_KEYS = {"cursor": "cursor", "nextPageToken": "pageToken", "searchAfter": "searchAfter"}
+
+def find_cursor(resp_json: Any):
+    """
+    Look for a next-page cursor in a search response.
+    Returns (payload_key, value), or None if the response carries no cursor.
+    Besides explicit cursor keys, Elasticsearch-style hits expose their sort values,
+    which are sent back as searchAfter.
+    """
+    hits = resp_json
+    if isinstance(resp_json, dict):
+        for key, payload_key in CURSOR_KEYS.items():
+            if resp_json.get(key):
+                return payload_key, resp_json[key]
+        outer = resp_json.get("hits")
+        hits = outer.get("hits") if isinstance(outer, dict) else None
+    if isinstance(hits, list) and hits and isinstance(hits[-1], dict) and hits[-1].get("sort"):
+        return "searchAfter", hits[-1]["sort"]
+    return None
 
 def dedupe_preserve_order(seq: List[str]) -> List[str]:
-    seen = set()
-    out: List[str] = []
-    for x in seq:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
-
-def fetch_canonical_ids_smart(session: requests.Session, base_payload: Dict) -> List[str]:
+    # dicts keep insertion order, so this drops repeats and keeps first occurrences
+    return list(dict.fromkeys(seq))
+
+def fetch_canonical_ids_smart(client: httpx.Client, base_payload: Dict) -> Tuple[List[str], bool]:
     """
     Try fetching canonical IDs using a large single request first, and then several pagination strategies if needed.
-    Returns a deduplicated list of canonical IDs (strings).
+    Returns a deduplicated list of canonical IDs (strings) and whether the list is known to be complete,
+    i.e. pagination reached the last page rather than stopping on an error or the safe cap.
     """
     collected: List[str] = []
 
-    payload_single = copy.deepcopy(base_payload)
-    payload_single["limit"] = MAX_SINGLE_LIMIT
+    # Shallow merges below are safe: only top-level scalars are added, base_payload["where"] is never mutated
+    payload_single = {**base_payload, "limit": MAX_SINGLE_LIMIT}
     print(f"Attempting single search request with limit={MAX_SINGLE_LIMIT} ...")
-    resp = try_post(session, SEARCH_URL, payload_single)
+    resp = try_post(client, SEARCH_URL, payload_single)
     if resp is None:
         sys.exit(2)
     if resp.status_code == 401:
@@ -177,7 +250,7 @@ def fetch_canonical_ids_smart(session: requests.Session, base_payload: Dict) ->
         sys.exit(4)
 
     try:
-        data = resp.json()
+        data = orjson.loads(resp.content)
     except Exception as e:
         print("Failed to parse JSON from search response:", e)
         sys.exit(5)
@@ -189,7 +262,43 @@ def fetch_canonical_ids_smart(session: requests.Session, base_payload: Dict) ->
     # If less than the requested limit — assume complete.
     if len(first_batch) < MAX_SINGLE_LIMIT:
         print("Less than limit returned — assuming complete list.")
-        return dedupe_preserve_order(collected)
+        return dedupe_preserve_order(collected), True
+
+    # Prefer a server-provided cursor: each page is a seek instead of an offset re-scan,
+    # and no strategy probing is needed
+    cursor = find_cursor(data)
+    if cursor is not None:
+        print(f"Search response carries a cursor — paginating with '{cursor[0]}', page_size={PAGINATION_LIMIT} ...")
+        items = list(collected)
+        complete = False
+        while cursor is not None and len(items) < SAFE_TOTAL_CAP:
+            cursor_key, cursor_value = cursor
+            page_payload = {**base_payload, "limit": PAGINATION_LIMIT, cursor_key: cursor_value}
+            resp_page = try_post(client, SEARCH_URL, page_payload)
+            if resp_page is None or resp_page.status_code != 200:
+                print("Cursor pagination stopped (HTTP status or network).")
+                break
+            try:
+                page_json = orjson.loads(resp_page.content)
+            except Exception:
+                print("Failed to parse JSON during cursor pagination.")
+                break
+            page_ids = extract_canonical_ids_from_search_response(page_json)
+            if not page_ids:
+                complete = True
+                break
+            items.extend(page_ids)
+            print(f"  got {len(page_ids)} canonical IDs (total collected {len(items)})")
+            if len(page_ids) < PAGINATION_LIMIT:
+                complete = True
+                break
+            next_cursor = find_cursor(page_json)
+            cursor = next_cursor if next_cursor != cursor else None
+            complete = cursor is None
+        if len(items) > len(collected):
+            print(f"Cursor pagination retrieved additional canonical IDs (total {len(items)}).")
+            return dedupe_preserve_order(items), complete
+        print("No extra canonical IDs found using the cursor. Falling back to other strategies...")
 
     # Try several pagination strategies because equal-to-limit suggests more data exists.
     print("Response size equals requested limit — trying pagination strategies...")
@@ -200,36 +309,37 @@ def fetch_canonical_ids_smart(session: requests.Session, base_payload: Dict) ->
         print(f"Trying offset-style pagination with key='{key}', page_size={PAGINATION_LIMIT} ...")
         items = list(collected)
         offset = len(first_batch)
+        complete = False
         while True:
             if len(items) >= SAFE_TOTAL_CAP:
                 print(f"Reached safe cap {SAFE_TOTAL_CAP}; stopping offset pagination.")
                 break
-            page_payload = copy.deepcopy(base_payload)
-            page_payload["limit"] = PAGINATION_LIMIT
-            page_payload[key] = offset
-            resp_page = try_post(session, SEARCH_URL, page_payload)
+            page_payload = {**base_payload, "limit": PAGINATION_LIMIT, key: offset}
+            resp_page = try_post(client, SEARCH_URL, page_payload)
             if resp_page is None or resp_page.status_code != 200:
                 print(f"Offset pagination with key={key} stopped (HTTP status or network).")
                 break
             try:
-                page_json = resp_page.json()
+                page_json = orjson.loads(resp_page.content)
             except Exception:
                 print("Failed to parse JSON during offset pagination.")
                 break
             page_ids = extract_canonical_ids_from_search_response(page_json)
             if not page_ids:
                 print(f"No more results for offset key '{key}'.")
+                complete = True
                 break
             items.extend(page_ids)
             print(f"  got {len(page_ids)} canonical IDs (total collected {len(items)})")
             if len(page_ids) < PAGINATION_LIMIT:
                 print("  Last page smaller than page_size -> finishing offset pagination.")
+                complete = True
                 break
             offset += len(page_ids)
         if len(items) > len(collected):
             print(f"Offset-style pagination with key='{key}' retrieved additional canonical IDs (total {len(items)}).")
             collected = items
-            return dedupe_preserve_order(collected)
+            return dedupe_preserve_order(collected), complete
         else:
             print(f"No extra canonical IDs found using key='{key}'. Trying next strategy...")
 
@@ -239,55 +349,132 @@ def fetch_canonical_ids_smart(session: requests.Session, base_payload: Dict) ->
         for start_page in (0, 1):
             items = list(collected)
             page = start_page
+            complete = False
             while True:
                 if len(items) >= SAFE_TOTAL_CAP:
                     print(f"Reached safe cap {SAFE_TOTAL_CAP}; stopping page-based pagination.")
                     break
-                page_payload = copy.deepcopy(base_payload)
-                page_payload[size_key] = PAGINATION_LIMIT
-                page_payload["page"] = page
-                resp_page = try_post(session, SEARCH_URL, page_payload)
+                page_payload = {**base_payload, size_key: PAGINATION_LIMIT, "page": page}
+                resp_page = try_post(client, SEARCH_URL, page_payload)
                 if resp_page is None or resp_page.status_code != 200:
                     break
                 try:
-                    page_json = resp_page.json()
+                    page_json = orjson.loads(resp_page.content)
                 except Exception:
                     break
                 page_ids = extract_canonical_ids_from_search_response(page_json)
                 if not page_ids:
+                    complete = True
                     break
                 items.extend(page_ids)
                 print(f"  page {page} got {len(page_ids)} canonical IDs (total {len(items)})")
                 if len(page_ids) < PAGINATION_LIMIT:
+                    complete = True
                     break
                 page += 1
             if len(items) > len(collected):
                 print(f"Page-based pagination (start_page {start_page}, size_key '{size_key}') retrieved extra canonical IDs (total {len(items)})")
                 collected = items
-                return dedupe_preserve_order(collected)
+                return dedupe_preserve_order(collected), complete
 
     # Last-resort: bigger single limit (bounded)
     LAST_RESORT_LIMIT = min(5000, SAFE_TOTAL_CAP)
     if LAST_RESORT_LIMIT > MAX_SINGLE_LIMIT:
         print(f"Last resort: trying larger single request limit={LAST_RESORT_LIMIT} ...")
-        payload_last = copy.deepcopy(base_payload)
-        payload_last["limit"] = LAST_RESORT_LIMIT
-        resp_last = try_post(session, SEARCH_URL, payload_last)
+        payload_last = {**base_payload, "limit": LAST_RESORT_LIMIT}
+        resp_last = try_post(client, SEARCH_URL, payload_last)
         if resp_last and resp_last.status_code == 200:
             try:
-                last_json = resp_last.json()
+                last_json = orjson.loads(resp_last.content)
                 last_ids = extract_canonical_ids_from_search_response(last_json)
                 if isinstance(last_ids, list) and len(last_ids) > len(collected):
                     collected = last_ids
                     print(f"Last-resort request returned {len(collected)} canonical IDs.")
-                    return dedupe_preserve_order(collected)
+                    return dedupe_preserve_order(collected), len(last_ids) < LAST_RESORT_LIMIT
             except Exception:
                 pass
 
     print("Pagination strategies exhausted. Returning collected canonical IDs (may be partial).")
-    return dedupe_preserve_order(collected)
+    return dedupe_preserve_order(collected), False
+
+def batch_cache_path(chunk: List[str]) -> Path:
+    digest = hashlib.sha1(",".join(sorted(chunk)).encode()).hexdigest()
+    return Path(BATCH_CACHE_DIR) / f"{digest}.json"
+
+def batch_ideas(data: Any):
+    """
+    Return the idea objects in a parsed fetchByCanonicalIdByBatch response,
+    or None if the response has neither of the expected shapes.
+    """
+    # The endpoint example returns an object mapping internal ids to idea objects.
+    if isinstance(data, dict):
+        # extend with values (idea objects)
+        return [v for v in data.values() if isinstance(v, dict)]
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    return None
+
+def fetch_batch(client: httpx.Client, idx: int, chunk: List[str], refresh: bool = False) -> List[Dict]:
+    """
+    POST one chunk of canonical IDs to fetchByCanonicalIdByBatch and return the idea objects.
+    Usable responses are cached under BATCH_CACHE_DIR and reused unless refresh is set;
+    network errors and 429/5xx responses are retried with backoff.
+    Safe to call from worker threads; errors exit the script as before.
+    """
+    cache_path = batch_cache_path(chunk)
+    ideas_list = None
+    if cache_path.exists() and not refresh:
+        # An unreadable or unexpected cache file is a miss, not an error
+        try:
+            ideas_list = batch_ideas(orjson.loads(cache_path.read_bytes()))
+        except (OSError, orjson.JSONDecodeError):
+            pass
+        source = "cached"
+    if ideas_list is None:
+        payload = {"context": "PASHAHolding", "targets": chunk}
+        for attempt in range(BATCH_RETRIES + 1):
+            if attempt:
+                print(f"  chunk {idx}: retrying ({attempt}/{BATCH_RETRIES})")
+                time.sleep(2 ** attempt)
+            resp = try_post(client, FETCH_BY_CANONICAL_BATCH_URL, payload)
+            if resp is not None and resp.status_code not in RETRY_STATUSES:
+                break
+        if resp is None:
+            print(f"Network error during batch {idx}. Aborting.")
+            sys.exit(6)
+        if resp.status_code == 401:
+            print("Unauthorized (401) during batch fetch. Token invalid or expired.")
+            sys.exit(7)
+        if resp.status_code != 200:
+            print(f"Batch endpoint returned {resp.status_code} for chunk {idx}: {resp.text[:300]}")
+            sys.exit(8)
+        try:
+            data = orjson.loads(resp.content)
+        except Exception as e:
+            print(f"Failed to parse JSON for chunk {idx}: {e}")
+            sys.exit(9)
+        ideas_list = batch_ideas(data)
+        if ideas_list is None:
+            print(f"Unexpected batch response format for chunk {idx}: {type(data)}")
+            sys.exit(10)
+        # Cached only once known to be usable; write-then-rename so an
+        # interrupted run never leaves a truncated cache file
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_bytes(resp.content)
+        tmp_path.replace(cache_path)
+        source = "fetched"
+
+    print(f"  chunk {idx}: {source} {len(ideas_list)} idea objects")
+    return ideas_list
 
 def main():
+    parser = argparse.ArgumentParser(description="Fetch ideas and save them to Parquet.")
+    parser.add_argument("--csv", action="store_true", help=f"also write {CSV_OUTPUT}")
+    parser.add_argument("--xlsx", action="store_true", help=f"also write {XLSX_OUTPUT}")
+    parser.add_argument("--refresh", action="store_true",
+                        help=f"ignore {IDS_CACHE} and {BATCH_CACHE_DIR}/ and re-download everything")
+    args = parser.parse_args()
+
     if not TOKEN or TOKEN.startswith("eyJYOUR"):
         print("ERROR: open main_ideas.py and set TOKEN to your Bearer token string.")
         sys.exit(1)
@@ -300,8 +487,10 @@ def main():
         # "app-id": "app",
     }
 
-    session = requests.Session()
-    session.headers.update(headers)
+    # HTTP/2 multiplexes the concurrent batch requests over pooled keep-alive connections;
+    # httpx.Client is thread-safe, so the fetch workers share it
+    limits = httpx.Limits(max_connections=FETCH_WORKERS, max_keepalive_connections=FETCH_WORKERS)
+    client = httpx.Client(http2=True, headers=headers, timeout=30.0, limits=limits)
 
     # base search payload (as in your example)
     base_payload = {
@@ -314,8 +503,28 @@ def main():
         # "limit" will be set/managed by fetch_canonical_ids_smart
     }
 
-    print("1) Fetching canonical IDs from ticket-attachment search (smart pagination)...")
-    canonical_ids = fetch_canonical_ids_smart(session, base_payload)
+    # The ID cache is only valid for the search it was made with (e.g. the same date range);
+    # an unreadable cache file is treated as a miss
+    ids_cache = Path(IDS_CACHE)
+    cached = None
+    if ids_cache.exists() and not args.refresh:
+        try:
+            cached = orjson.loads(ids_cache.read_bytes())
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"Ignoring unreadable {IDS_CACHE}: {e}")
+    if isinstance(cached, dict) and cached.get("payload") == base_payload:
+        print(f"1) Loading canonical IDs from {IDS_CACHE} (use --refresh to re-fetch)...")
+        canonical_ids = cached["ids"]
+    else:
+        print("1) Fetching canonical IDs from ticket-attachment search (smart pagination)...")
+        canonical_ids, complete = fetch_canonical_ids_smart(client, base_payload)
+        # Only a complete list is worth reusing; a partial or capped one is re-fetched next run
+        if canonical_ids and complete and len(canonical_ids) < SAFE_TOTAL_CAP:
+            tmp_path = ids_cache.with_suffix(".tmp")
+            tmp_path.write_bytes(orjson.dumps({"payload": base_payload, "ids": canonical_ids}))
+            tmp_path.replace(ids_cache)
+        elif canonical_ids:
+            print(f"Canonical ID list may be partial; not caching it in {IDS_CACHE}.")
     if not canonical_ids:
         print("No canonical IDs found. Exiting.")
         sys.exit(0)
@@ -325,38 +534,23 @@ def main():
         print("WARNING: reached safe cap — there may be more records on the server.")
 
     # Prepare targets for fetchByCanonicalIdByBatch
-    print(f"2) Fetching idea objects in batches of {BATCH_SIZE} ...")
+    print(f"2) Fetching idea objects in batches of {BATCH_SIZE} ({FETCH_WORKERS} concurrent requests) ...")
+    chunks = list(chunked_iterable(canonical_ids, BATCH_SIZE))
+    Path(BATCH_CACHE_DIR).mkdir(exist_ok=True)
     all_ideas: List[Dict] = []
-    for idx, chunk in enumerate(chunked_iterable(canonical_ids, BATCH_SIZE), start=1):
-        payload = {"context": "PASHAHolding", "targets": chunk}
-        resp = try_post(session, FETCH_BY_CANONICAL_BATCH_URL, payload)
-        if resp is None:
-            print(f"Network error during batch {idx}. Aborting.")
-            sys.exit(6)
-        if resp.status_code == 401:
-            print("Unauthorized (401) during batch fetch. Token invalid or expired.")
-            sys.exit(7)
-        if resp.status_code != 200:
-            print(f"Batch endpoint returned {resp.status_code} for chunk {idx}: {resp.text[:300]}")
-            sys.exit(8)
-        try:
-            data = resp.json()
-        except Exception as e:
-            print(f"Failed to parse JSON for chunk {idx}: {e}")
-            sys.exit(9)
-
-        # The endpoint example returns an object mapping internal ids to idea objects.
-        if isinstance(data, dict):
-            # extend with values (idea objects)
-            ideas_list = [v for v in data.values() if isinstance(v, dict)]
-        elif isinstance(data, list):
-            ideas_list = [item for item in data if isinstance(item, dict)]
-        else:
-            print(f"Unexpected batch response format for chunk {idx}: {type(data)}")
-            sys.exit(10)
-
-        print(f"  chunk {idx}: fetched {len(ideas_list)} idea objects")
-        all_ideas.extend(ideas_list)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        futures = [executor.submit(fetch_batch, client, idx, chunk, args.refresh)
+                   for idx, chunk in enumerate(chunks, start=1)]
+        # Stop at the first failed batch (fetch_batch exits on errors): cancel the
+        # queued batches instead of letting them all run, and their retries, first
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = next((f for f in futures if f in done and f.exception() is not None), None)
+        if failed is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise failed.exception()
+        # Collected in submission order, so ideas keep the search order
+        for future in futures:
+            all_ideas.extend(future.result())
 
     print(f"Total idea objects fetched: {len(all_ideas)}")
     if not all_ideas:
@@ -366,16 +560,30 @@ def main():
     print("Normalizing and flattening idea objects...")
     df = normalize_ideas(all_ideas)
 
-    print(f"Writing CSV -> {CSV_OUTPUT}")
-    df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+    print(f"Writing Parquet -> {PARQUET_OUTPUT}")
+    df.to_parquet(PARQUET_OUTPUT, index=False, compression="zstd")
+    outputs = [PARQUET_OUTPUT]
+
+    if args.csv:
+        print(f"Writing CSV -> {CSV_OUTPUT}")
+        # Arrow's multithreaded writer instead of pandas' per-cell Python loop;
+        # pandas' writer still handles any column Arrow cannot convert
+        try:
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), CSV_OUTPUT)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            print(f"Arrow CSV writer failed ({e}); falling back to pandas")
+            df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+        outputs.append(CSV_OUTPUT)
 
-    print(f"Writing Excel -> {XLSX_OUTPUT}")
-    df.to_excel(XLSX_OUTPUT, index=False)
+    if args.xlsx:
+        print(f"Writing Excel -> {XLSX_OUTPUT}")
+        write_xlsx(df, XLSX_OUTPUT)
+        outputs.append(XLSX_OUTPUT)
 
     print("Done.")
     print("Created files:")
-    print(" -", CSV_OUTPUT)
-    print(" -", XLSX_OUTPUT)
+    for path in outputs:
+        print(" -", path)
 
 if __name__ == "__main__":
     main()